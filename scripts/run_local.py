@@ -107,7 +107,9 @@ def run_silver_layer(spark: SparkSession, input_path: str, output_path: str):
         transform_customers,
         transform_products,
         transform_orders,
-        transform_order_items
+        transform_order_items,
+        count_and_check_qc,
+        drop_qc_columns
     )
     
     transformations = {
@@ -130,17 +132,21 @@ def run_silver_layer(spark: SparkSession, input_path: str, output_path: str):
         df = spark.read.parquet(bronze_path)
         logger.info(f"  Read {df.count()} records from bronze")
         
-        # Apply transformation
-        df_silver = transform_fn(df)
-        
-        # Write to silver layer
+        # Apply transformation, checking and dropping QC columns as Glue does
+        df_transformed = transform_fn(df).persist()
         silver_path = os.path.join(output_path, "silver", table)
+        try:
+            silver_count = count_and_check_qc(df_transformed, table)
+            df_silver = drop_qc_columns(df_transformed, table)
+            
+            # Write to silver layer
+            (df_silver.write
+             .mode("overwrite")
+             .parquet(silver_path))
+        finally:
+            df_transformed.unpersist()
         
-        (df_silver.write
-         .mode("overwrite")
-         .parquet(silver_path))
-        
-        logger.info(f"  ✅ Wrote {df_silver.count()} records to {silver_path}")
+        logger.info(f"  ✅ Wrote {silver_count} records to {silver_path}")
     
     logger.info("Silver layer complete!")
 
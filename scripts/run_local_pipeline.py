@@ -98,7 +98,8 @@ def run_silver(spark, base_path: str):
     # Import transformation functions
     from src.glue_jobs.silver.transform_to_silver import (
         transform_customers, transform_products, 
-        transform_orders, transform_order_items
+        transform_orders, transform_order_items,
+        count_and_check_qc, drop_qc_columns
     )
     
     transformations = {
@@ -122,15 +123,18 @@ def run_silver(spark, base_path: str):
         df = spark.read.parquet(input_path)
         print(f"    Read {df.count()} records from bronze")
         
-        # Apply transformation
-        df_transformed = transform_fn(df)
+        # Apply transformation, checking and dropping QC columns as Glue does
+        df_transformed = transform_fn(df).persist()
+        try:
+            count = count_and_check_qc(df_transformed, table)
+            
+            # Write to silver
+            (drop_qc_columns(df_transformed, table).write
+             .mode("overwrite")
+             .parquet(output_path))
+        finally:
+            df_transformed.unpersist()
         
-        # Write to silver
-        (df_transformed.write
-         .mode("overwrite")
-         .parquet(output_path))
-        
-        count = df_transformed.count()
         print(f"  ✅ {table}: {count} records → {output_path}")
     
     print("\n🥈 Silver layer complete!")
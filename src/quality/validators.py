@@ -15,16 +15,67 @@ We implement checks at multiple levels:
 5. Business rules (custom logic)
 """
 
-from typing import List, Dict, Tuple, Optional
+import time
+from functools import reduce
+from operator import and_
+from typing import Any, Callable, List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
-from pyspark.sql import DataFrame
+from pyspark.sql import Column, DataFrame
 from pyspark.sql import functions as F
+from pyspark.storagelevel import StorageLevel
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+_BYTE_UNITS = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+
+def _parse_bytes(value: str) -> int:
+    """Parse a Spark byte-size setting such as "10485760", "10m" or "10MB"."""
+    value = value.strip().lower().rstrip("b") or "0"
+    if value[-1] in _BYTE_UNITS:
+        return int(value[:-1]) * _BYTE_UNITS[value[-1]]
+    return int(value)
+
+
+def _should_broadcast(df: DataFrame) -> bool:
+    """
+    Decide whether a DataFrame is small enough to broadcast.
+    
+    Broadcasts only what fits the session's autoBroadcastJoinThreshold,
+    judged by the optimizer's size estimate; anything larger, or with no
+    estimate, is left to Spark (usually a sort-merge join). Nothing is
+    broadcast when broadcast joins are disabled (threshold -1).
+    
+    The estimate is read through the JVM plan, so it is only available
+    on a classic (non-Connect) session; elsewhere this returns False.
+    
+    Args:
+        df: DataFrame to broadcast
+        
+    Returns:
+        True if the DataFrame should be broadcast
+    """
+    spark = df.sparkSession
+    try:
+        threshold = _parse_bytes(
+            spark.conf.get("spark.sql.autoBroadcastJoinThreshold", "10485760"))
+    except ValueError:
+        return False
+    if threshold < 0:
+        return False
+    
+    try:
+        size = int(df._jdf.queryExecution().optimizedPlan()
+                   .stats().sizeInBytes().toString())
+    except Exception:
+        # No estimate (e.g. Spark Connect); let the planner decide
+        return False
+    return size <= threshold
+
+
 class CheckSeverity(Enum):
     """Severity levels for data quality issues."""
     WARNING = "warning"   # Log but continue
@@ -56,17 +107,36 @@ class DataQualityValidator:
     
     Usage:
         validator = DataQualityValidator(df)
-        results = validator.run_all_checks()
+        validator.check_not_null(["id"])
         
         if not validator.all_passed():
             raise DataQualityError("Quality checks failed")
+    
+    With deferred=True the aggregate-based checks (not null, unique, value
+    set, range, row count, freshness) are only collected, and run_all()
+    evaluates all of them in a single scan of the DataFrame:
+        validator = DataQualityValidator(df, deferred=True)
+        validator.check_not_null(["id"])
+        validator.check_unique(["id"])
+        results = validator.run_all()
+    
+    all_passed(), get_summary() and log_results() call run_all() first, so
+    checks still pending are never reported as passed.
     """
     
-    def __init__(self, df: DataFrame, table_name: str = "unknown"):
+    def __init__(
+        self,
+        df: DataFrame,
+        table_name: str = "unknown",
+        deferred: bool = False
+    ):
         self.df = df
         self.table_name = table_name
+        self.deferred = deferred
         self.results: List[QualityCheckResult] = []
         self._total_count = None
+        # (aggregate expression, callback building the result from its value)
+        self._pending: List[Tuple[Column, Callable[[Any], QualityCheckResult]]] = []
     
     @property
     def total_count(self) -> int:
@@ -75,6 +145,68 @@ class DataQualityValidator:
             self._total_count = self.df.count()
         return self._total_count
     
+    def _failed_percentage(self, failed_count: int) -> float:
+        """Failed rows as a percentage of the total row count."""
+        return (failed_count / self.total_count * 100
+                if self.total_count > 0 else 0)
+    
+    def _submit(
+        self,
+        aggregate: Column,
+        build_result: Callable[[Any], QualityCheckResult]
+    ) -> Optional[QualityCheckResult]:
+        """
+        Evaluate a check's aggregate now, or queue it for run_all().
+        
+        The row count is always computed in the same aggregation, so a
+        check never needs a separate count() job.
+        
+        Args:
+            aggregate: Aggregate expression producing the check's value
+            build_result: Builds the check result from the aggregate value
+            
+        Returns:
+            Check result, or None when deferred
+        """
+        if self.deferred:
+            self._pending.append((aggregate, build_result))
+            return None
+        
+        row = self.df.agg(
+            F.count(F.lit(1)).alias("_total"),
+            aggregate.alias("_value")
+        ).collect()[0]
+        self._total_count = row["_total"]
+        
+        result = build_result(row["_value"])
+        self.results.append(result)
+        return result
+    
+    def run_all(self) -> List[QualityCheckResult]:
+        """
+        Evaluate all deferred checks in a single aggregation.
+        
+        Returns:
+            Results of the checks evaluated by this call
+        """
+        if not self._pending:
+            return []
+        
+        pending, self._pending = self._pending, []
+        row = self.df.agg(
+            F.count(F.lit(1)).alias("_total"),
+            *[aggregate.alias(f"_check_{i}")
+              for i, (aggregate, _) in enumerate(pending)]
+        ).collect()[0]
+        self._total_count = row["_total"]
+        
+        results = []
+        for i, (_, build_result) in enumerate(pending):
+            result = build_result(row[f"_check_{i}"])
+            results.append(result)
+            self.results.append(result)
+        return results
+    
     def check_not_null(
         self,
         columns: List[str],
@@ -88,7 +220,7 @@ class DataQualityValidator:
             severity: How to treat failures
             
         Returns:
-            List of check results
+            List of check results (empty for deferred checks)
         """
         results = []
         
@@ -102,21 +234,24 @@ class DataQualityValidator:
                 ))
                 continue
             
-            null_count = self.df.filter(F.col(col_name).isNull()).count()
-            passed = null_count == 0
+            def build_result(value, col_name=col_name):
+                null_count = value or 0
+                return QualityCheckResult(
+                    check_name=f"not_null_{col_name}",
+                    passed=null_count == 0,
+                    severity=severity,
+                    message=f"Null check for '{col_name}'",
+                    failed_count=null_count,
+                    total_count=self.total_count,
+                    failed_percentage=self._failed_percentage(null_count)
+                )
             
-            result = QualityCheckResult(
-                check_name=f"not_null_{col_name}",
-                passed=passed,
-                severity=severity,
-                message=f"Null check for '{col_name}'",
-                failed_count=null_count,
-                total_count=self.total_count,
-                failed_percentage=(null_count / self.total_count * 100 
-                                   if self.total_count > 0 else 0)
+            result = self._submit(
+                F.sum(F.col(col_name).isNull().cast("long")),
+                build_result
             )
-            results.append(result)
-            self.results.append(result)
+            if result is not None:
+                results.append(result)
         
         return results
     
@@ -124,7 +259,7 @@ class DataQualityValidator:
         self,
         columns: List[str],
         severity: CheckSeverity = CheckSeverity.ERROR
-    ) -> QualityCheckResult:
+    ) -> Optional[QualityCheckResult]:
         """
         Check that specified columns form a unique key.
         
@@ -133,57 +268,68 @@ class DataQualityValidator:
             severity: How to treat failures
             
         Returns:
-            Check result
+            Check result (None when deferred)
         """
-        distinct_count = self.df.select(columns).distinct().count()
-        duplicate_count = self.total_count - distinct_count
-        passed = duplicate_count == 0
+        def build_result(distinct_count):
+            duplicate_count = self.total_count - distinct_count
+            return QualityCheckResult(
+                check_name=f"unique_{'+'.join(columns)}",
+                passed=duplicate_count == 0,
+                severity=severity,
+                message=f"Uniqueness check for {columns}",
+                failed_count=duplicate_count,
+                total_count=self.total_count,
+                failed_percentage=self._failed_percentage(duplicate_count)
+            )
         
-        result = QualityCheckResult(
-            check_name=f"unique_{'+'.join(columns)}",
-            passed=passed,
-            severity=severity,
-            message=f"Uniqueness check for {columns}",
-            failed_count=duplicate_count,
-            total_count=self.total_count,
-            failed_percentage=(duplicate_count / self.total_count * 100 
-                               if self.total_count > 0 else 0)
-        )
-        self.results.append(result)
-        return result
+        # Count distinct keys the way distinct() does, where null is a value
+        if len(columns) == 1:
+            # Plain distinct count of the column, plus one if any null exists
+            key = F.col(columns[0])
+            distinct_keys = (F.countDistinct(key) +
+                             F.coalesce(F.max(key.isNull().cast("long")), F.lit(0)))
+        else:
+            # A struct is never null, so rows with null key parts are kept
+            distinct_keys = F.countDistinct(F.struct(*columns))
+        
+        return self._submit(distinct_keys, build_result)
     
     def check_values_in_set(
         self,
         column: str,
         valid_values: List,
         severity: CheckSeverity = CheckSeverity.ERROR
-    ) -> QualityCheckResult:
+    ) -> Optional[QualityCheckResult]:
         """
         Check that column values are within a set of valid values.
         
+        Spark's optimizer turns a long isin() list into a hash set lookup
+        (InSet), so large sets stay in the single fused aggregation.
+        
         Args:
             column: Column to check
             valid_values: List of allowed values
             severity: How to treat failures
             
         Returns:
-            Check result
+            Check result (None when deferred)
         """
-        invalid_count = self.df.filter(~F.col(column).isin(valid_values)).count()
-        passed = invalid_count == 0
+        def build_result(value):
+            invalid_count = value or 0
+            return QualityCheckResult(
+                check_name=f"valid_values_{column}",
+                passed=invalid_count == 0,
+                severity=severity,
+                message=f"Values in '{column}' must be one of {valid_values}",
+                failed_count=invalid_count,
+                total_count=self.total_count,
+                failed_percentage=self._failed_percentage(invalid_count)
+            )
         
-        result = QualityCheckResult(
-            check_name=f"valid_values_{column}",
-            passed=passed,
-            severity=severity,
-            message=f"Values in '{column}' must be one of {valid_values}",
-            failed_count=invalid_count,
-            total_count=self.total_count,
-            failed_percentage=(invalid_count / self.total_count * 100 
-                               if self.total_count > 0 else 0)
+        return self._submit(
+            F.sum((~F.col(column).isin(valid_values)).cast("long")),
+            build_result
         )
-        self.results.append(result)
-        return result
     
     def check_range(
         self,
@@ -191,7 +337,7 @@ class DataQualityValidator:
         min_value: Optional[float] = None,
         max_value: Optional[float] = None,
         severity: CheckSeverity = CheckSeverity.ERROR
-    ) -> QualityCheckResult:
+    ) -> Optional[QualityCheckResult]:
         """
         Check that numeric column values fall within a range.
         
@@ -202,32 +348,30 @@ class DataQualityValidator:
             severity: How to treat failures
             
         Returns:
-            Check result
+            Check result (None when deferred)
         """
-        condition = F.lit(True)
-        
+        bounds = []
         if min_value is not None:
-            condition = condition & (F.col(column) >= min_value)
+            bounds.append(F.col(column) >= min_value)
         if max_value is not None:
-            condition = condition & (F.col(column) <= max_value)
-        
-        invalid_count = self.df.filter(~condition).count()
-        passed = invalid_count == 0
+            bounds.append(F.col(column) <= max_value)
+        condition = reduce(and_, bounds) if bounds else F.lit(True)
         
         range_desc = f"[{min_value}, {max_value}]"
         
-        result = QualityCheckResult(
-            check_name=f"range_{column}",
-            passed=passed,
-            severity=severity,
-            message=f"Values in '{column}' must be in range {range_desc}",
-            failed_count=invalid_count,
-            total_count=self.total_count,
-            failed_percentage=(invalid_count / self.total_count * 100 
-                               if self.total_count > 0 else 0)
-        )
-        self.results.append(result)
-        return result
+        def build_result(value):
+            invalid_count = value or 0
+            return QualityCheckResult(
+                check_name=f"range_{column}",
+                passed=invalid_count == 0,
+                severity=severity,
+                message=f"Values in '{column}' must be in range {range_desc}",
+                failed_count=invalid_count,
+                total_count=self.total_count,
+                failed_percentage=self._failed_percentage(invalid_count)
+            )
+        
+        return self._submit(F.sum((~condition).cast("long")), build_result)
     
     def check_referential_integrity(
         self,
@@ -239,6 +383,9 @@ class DataQualityValidator:
         """
         Check that foreign key values exist in reference table.
         
+        This check needs a join, so it always runs immediately, even for
+        a deferred validator.
+        
         Args:
             column: Foreign key column in this DataFrame
             reference_df: Reference DataFrame
@@ -248,20 +395,26 @@ class DataQualityValidator:
         Returns:
             Check result
         """
-        # Get distinct foreign key values
-        fk_values = self.df.select(column).distinct()
-        
-        # Get distinct primary key values
+        # Get distinct primary key values (the small side)
         pk_values = reference_df.select(reference_column).distinct()
         
-        # Find orphan records (FK values not in PK)
+        # Broadcast the key set to avoid shuffling the fact side, unless
+        # it is above the session's broadcast threshold
+        pk_side = pk_values
+        if _should_broadcast(pk_values):
+            pk_side = F.broadcast(pk_values)
+        
+        # Find orphan FK values (FK values not in PK)
+        # The fact side is not deduplicated up front: the anti-join scans it
+        # directly and countDistinct collapses repeated orphan values
+        fk_values = self.df.select(column)
         orphans = fk_values.join(
-            pk_values,
+            pk_side,
             fk_values[column] == pk_values[reference_column],
             "left_anti"
         )
         
-        orphan_count = orphans.count()
+        orphan_count = orphans.agg(F.countDistinct(column)).collect()[0][0]
         passed = orphan_count == 0
         
         result = QualityCheckResult(
@@ -271,8 +424,7 @@ class DataQualityValidator:
             message=f"Foreign key '{column}' must exist in reference table",
             failed_count=orphan_count,
             total_count=self.total_count,
-            failed_percentage=(orphan_count / self.total_count * 100 
-                               if self.total_count > 0 else 0)
+            failed_percentage=self._failed_percentage(orphan_count)
         )
         self.results.append(result)
         return result
@@ -282,7 +434,7 @@ class DataQualityValidator:
         min_count: int = 1,
         max_count: Optional[int] = None,
         severity: CheckSeverity = CheckSeverity.ERROR
-    ) -> QualityCheckResult:
+    ) -> Optional[QualityCheckResult]:
         """
         Check that DataFrame has expected number of rows.
         
@@ -292,34 +444,33 @@ class DataQualityValidator:
             severity: How to treat failures
             
         Returns:
-            Check result
+            Check result (None when deferred)
         """
-        count = self.total_count
-        passed = count >= min_count
-        if max_count is not None:
-            passed = passed and count <= max_count
-        
         range_desc = f">= {min_count}"
         if max_count is not None:
             range_desc = f"[{min_count}, {max_count}]"
         
-        result = QualityCheckResult(
-            check_name="row_count",
-            passed=passed,
-            severity=severity,
-            message=f"Row count ({count}) must be {range_desc}",
-            failed_count=0 if passed else 1,
-            total_count=count
-        )
-        self.results.append(result)
-        return result
+        def build_result(count):
+            passed = count >= min_count
+            if max_count is not None:
+                passed = passed and count <= max_count
+            return QualityCheckResult(
+                check_name="row_count",
+                passed=passed,
+                severity=severity,
+                message=f"Row count ({count}) must be {range_desc}",
+                failed_count=0 if passed else 1,
+                total_count=count
+            )
+        
+        return self._submit(F.count(F.lit(1)), build_result)
     
     def check_freshness(
         self,
         timestamp_column: str,
         max_age_hours: int = 24,
         severity: CheckSeverity = CheckSeverity.WARNING
-    ) -> QualityCheckResult:
+    ) -> Optional[QualityCheckResult]:
         """
         Check that data is recent (not stale).
         
@@ -329,30 +480,30 @@ class DataQualityValidator:
             severity: How to treat failures
             
         Returns:
-            Check result
+            Check result (None when deferred)
         """
-        # Get the most recent timestamp
-        max_ts = self.df.agg(F.max(timestamp_column)).collect()[0][0]
-        
-        if max_ts is None:
-            passed = False
-            message = "No timestamps found in data"
-        else:
-            from datetime import datetime, timezone
-            now = datetime.now(timezone.utc)
-            age_hours = (now - max_ts.replace(tzinfo=timezone.utc)).total_seconds() / 3600
-            passed = age_hours <= max_age_hours
-            message = f"Most recent data is {age_hours:.1f} hours old (max: {max_age_hours})"
+        def build_result(max_ts_epoch):
+            if max_ts_epoch is None:
+                passed = False
+                message = "No timestamps found in data"
+            else:
+                age_hours = (time.time() - max_ts_epoch) / 3600
+                passed = age_hours <= max_age_hours
+                message = (f"Most recent data is {age_hours:.1f} hours old "
+                           f"(max: {max_age_hours})")
+            return QualityCheckResult(
+                check_name=f"freshness_{timestamp_column}",
+                passed=passed,
+                severity=severity,
+                message=message,
+                total_count=self.total_count
+            )
         
-        result = QualityCheckResult(
-            check_name=f"freshness_{timestamp_column}",
-            passed=passed,
-            severity=severity,
-            message=message,
-            total_count=self.total_count
+        # Most recent timestamp as epoch seconds
+        return self._submit(
+            F.max(timestamp_column).cast("long"),
+            build_result
         )
-        self.results.append(result)
-        return result
     
     def all_passed(self, include_warnings: bool = False) -> bool:
         """
@@ -364,6 +515,7 @@ class DataQualityValidator:
         Returns:
             True if all checks passed
         """
+        self.run_all()
         for result in self.results:
             if not result.passed:
                 if result.severity == CheckSeverity.ERROR:
@@ -374,6 +526,7 @@ class DataQualityValidator:
     
     def get_summary(self) -> str:
         """Get a summary of all check results."""
+        self.run_all()
         lines = [f"Data Quality Report for {self.table_name}"]
         lines.append("=" * 50)
         lines.append(f"Total rows: {self.total_count}")
@@ -392,6 +545,7 @@ class DataQualityValidator:
     
     def log_results(self):
         """Log all results using the logging module."""
+        self.run_all()
         logger.info(f"Data Quality Results for {self.table_name}")
         
         for result in self.results:
@@ -409,7 +563,7 @@ class DataQualityValidator:
 
 def validate_customers(df: DataFrame) -> DataQualityValidator:
     """Run standard validation suite for customers table."""
-    validator = DataQualityValidator(df, "customers")
+    validator = DataQualityValidator(df, "customers", deferred=True)
     
     # Required fields
     validator.check_not_null(["customer_id", "email", "country"])
@@ -421,12 +575,15 @@ def validate_customers(df: DataFrame) -> DataQualityValidator:
     # Row count (expect at least some customers)
     validator.check_row_count(min_count=1)
     
+    # Evaluate all checks above in one scan
+    validator.run_all()
+    
     return validator
 
 
 def validate_products(df: DataFrame) -> DataQualityValidator:
     """Run standard validation suite for products table."""
-    validator = DataQualityValidator(df, "products")
+    validator = DataQualityValidator(df, "products", deferred=True)
     
     # Required fields
     validator.check_not_null(["product_id", "name", "price", "category"])
@@ -441,33 +598,44 @@ def validate_products(df: DataFrame) -> DataQualityValidator:
     validator.check_range("margin_percent", min_value=-100, max_value=100,
                           severity=CheckSeverity.WARNING)
     
+    # Evaluate all checks above in one scan
+    validator.run_all()
+    
     return validator
 
 
 def validate_orders(df: DataFrame, customers_df: DataFrame) -> DataQualityValidator:
     """Run standard validation suite for orders table."""
-    validator = DataQualityValidator(df, "orders")
-    
-    # Required fields
-    validator.check_not_null(["order_id", "customer_id", "order_date", "total_amount"])
-    
-    # Uniqueness
-    validator.check_unique(["order_id"])
-    
-    # Value ranges
-    validator.check_range("total_amount", min_value=0)
-    validator.check_range("subtotal", min_value=0)
-    
-    # Valid status values
-    validator.check_values_in_set(
-        "status",
-        ["pending", "confirmed", "shipped", "delivered", "cancelled", "returned"]
-    )
-    
-    # Referential integrity
-    validator.check_referential_integrity(
-        "customer_id", customers_df, "customer_id"
-    )
+    # Cached: the fused scan and the referential integrity joins both read it
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+    try:
+        validator = DataQualityValidator(df, "orders", deferred=True)
+        
+        # Required fields
+        validator.check_not_null(["order_id", "customer_id", "order_date", "total_amount"])
+        
+        # Uniqueness
+        validator.check_unique(["order_id"])
+        
+        # Value ranges
+        validator.check_range("total_amount", min_value=0)
+        validator.check_range("subtotal", min_value=0)
+        
+        # Valid status values
+        validator.check_values_in_set(
+            "status",
+            ["pending", "confirmed", "shipped", "delivered", "cancelled", "returned"]
+        )
+        
+        # Evaluate all checks above in one scan
+        validator.run_all()
+        
+        # Referential integrity
+        validator.check_referential_integrity(
+            "customer_id", customers_df, "customer_id"
+        )
+    finally:
+        df.unpersist(blocking=False)
     
     return validator
 
@@ -478,21 +646,29 @@ def validate_order_items(
     products_df: DataFrame
 ) -> DataQualityValidator:
     """Run standard validation suite for order_items table."""
-    validator = DataQualityValidator(df, "order_items")
-    
-    # Required fields
-    validator.check_not_null(["order_item_id", "order_id", "product_id", "quantity"])
-    
-    # Uniqueness
-    validator.check_unique(["order_item_id"])
-    
-    # Value ranges
-    validator.check_range("quantity", min_value=1)
-    validator.check_range("unit_price", min_value=0)
-    validator.check_range("discount_percent", min_value=0, max_value=100)
-    
-    # Referential integrity
-    validator.check_referential_integrity("order_id", orders_df, "order_id")
-    validator.check_referential_integrity("product_id", products_df, "product_id")
+    # Cached: the fused scan and the referential integrity joins both read it
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+    try:
+        validator = DataQualityValidator(df, "order_items", deferred=True)
+        
+        # Required fields
+        validator.check_not_null(["order_item_id", "order_id", "product_id", "quantity"])
+        
+        # Uniqueness
+        validator.check_unique(["order_item_id"])
+        
+        # Value ranges
+        validator.check_range("quantity", min_value=1)
+        validator.check_range("unit_price", min_value=0)
+        validator.check_range("discount_percent", min_value=0, max_value=100)
+        
+        # Evaluate all checks above in one scan
+        validator.run_all()
+        
+        # Referential integrity
+        validator.check_referential_integrity("order_id", orders_df, "order_id")
+        validator.check_referential_integrity("product_id", products_df, "product_id")
+    finally:
+        df.unpersist(blocking=False)
     
     return validator
@@ -8,6 +8,7 @@ from .spark_utils import (
     deduplicate_by_key,
     cast_columns,
     null_safe_trim,
+    apply_transforms,
     validate_not_null,
 )
 
@@ -28,6 +29,7 @@ __all__ = [
     "deduplicate_by_key",
     "cast_columns",
     "null_safe_trim",
+    "apply_transforms",
     "validate_not_null",
     # S3 utilities
     "get_s3_client",
@@ -1,12 +1,27 @@
 """Utility functions for S3 operations."""
 
 import boto3
+import functools
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Generator dumps and Parquet outputs are large; bigger parts and more
+# threads keep the upload bandwidth-bound rather than latency-bound.
+DEFAULT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=64 * 1024 * 1024,
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+)
 
+
+@functools.lru_cache(maxsize=8)
 def get_s3_client(region: str = "eu-west-1"):
     """
     Get an S3 client.
@@ -14,6 +29,9 @@ def get_s3_client(region: str = "eu-west-1"):
     In AWS Glue, credentials are automatically provided via IAM roles.
     For local development, uses credentials from ~/.aws/credentials
     
+    Clients are cached per region: building one is expensive, and boto3
+    clients are thread-safe, so every caller can share one.
+    
     Args:
         region: AWS region
         
@@ -23,35 +41,59 @@ def get_s3_client(region: str = "eu-west-1"):
     return boto3.client('s3', region_name=region)
 
 
+def _list_prefix(s3, bucket: str, prefix: str, suffix: Optional[str]) -> List[str]:
+    """List keys under one prefix, applying the suffix filter."""
+    objects = []
+    paginator = s3.get_paginator('list_objects_v2')
+    
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        if 'Contents' in page:
+            for obj in page['Contents']:
+                key = obj['Key']
+                if suffix is None or key.endswith(suffix):
+                    objects.append(key)
+    
+    return objects
+
+
 def list_s3_objects(
     bucket: str,
     prefix: str,
-    suffix: Optional[str] = None
+    suffix: Optional[str] = None,
+    shard_chars: Optional[str] = None,
+    max_workers: int = 16
 ) -> List[str]:
     """
     List objects in an S3 bucket with optional filtering.
     
+    Listing is paginated at 1000 keys per request, so large prefixes are
+    bound by round trips. If the character after the prefix is known
+    (e.g. hex-named objects), pass those characters as shard_chars to
+    list each sub-prefix concurrently.
+    
     Args:
         bucket: S3 bucket name
         prefix: Prefix to filter objects
         suffix: Optional suffix filter (e.g., '.csv')
+        shard_chars: Every possible character following the prefix
+            (e.g. '0123456789abcdef'); keys starting with any other
+            character are not listed
+        max_workers: Maximum concurrent list requests when sharding
         
     Returns:
         List of S3 keys
     """
     s3 = get_s3_client()
     
-    objects = []
-    paginator = s3.get_paginator('list_objects_v2')
+    if not shard_chars:
+        return _list_prefix(s3, bucket, prefix, suffix)
     
-    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-        if 'Contents' in page:
-            for obj in page['Contents']:
-                key = obj['Key']
-                if suffix is None or key.endswith(suffix):
-                    objects.append(key)
-    
-    return objects
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(shard_chars))) as executor:
+        futures = [
+            executor.submit(_list_prefix, s3, bucket, f"{prefix}{c}", suffix)
+            for c in shard_chars
+        ]
+        return list(chain.from_iterable(f.result() for f in futures))
 
 
 def build_s3_path(bucket: str, *parts: str) -> str:
@@ -65,6 +107,10 @@ def build_s3_path(bucket: str, *parts: str) -> str:
     Returns:
         Full S3 path (s3://bucket/path/to/object)
     """
+    # Fast path for the common (prefix, key) call; same result as below
+    if len(parts) == 2 and parts[0] and parts[1]:
+        return f"s3://{bucket}/{parts[0].strip('/')}/{parts[1].strip('/')}"
+
     path = "/".join(p.strip("/") for p in parts if p)
     return f"s3://{bucket}/{path}"
 
@@ -72,7 +118,8 @@ def build_s3_path(bucket: str, *parts: str) -> str:
 def upload_file_to_s3(
     local_path: str,
     bucket: str,
-    key: str
+    key: str,
+    config: Optional[TransferConfig] = None
 ) -> None:
     """
     Upload a local file to S3.
@@ -81,23 +128,37 @@ def upload_file_to_s3(
         local_path: Path to local file
         bucket: Destination bucket
         key: Destination key (path within bucket)
+        config: Multipart transfer settings (defaults to DEFAULT_TRANSFER_CONFIG)
     """
     s3 = get_s3_client()
-    s3.upload_file(local_path, bucket, key)
+    s3.upload_file(local_path, bucket, key, Config=config or DEFAULT_TRANSFER_CONFIG)
     logger.info(f"Uploaded {local_path} to s3://{bucket}/{key}")
 
 
-def check_path_exists(bucket: str, prefix: str) -> bool:
+def check_path_exists(bucket: str, prefix: str, head_first: bool = True) -> bool:
     """
     Check if an S3 path exists (has any objects).
     
+    When the prefix names a single object, a HEAD request answers in one
+    small round trip; otherwise it falls back to listing one key.
+    
     Args:
         bucket: S3 bucket name
         prefix: Prefix to check
+        head_first: Try head_object on the prefix as a full key first
         
     Returns:
         True if any objects exist with the prefix
     """
     s3 = get_s3_client()
+    
+    if head_first and prefix and not prefix.endswith("/"):
+        try:
+            s3.head_object(Bucket=bucket, Key=prefix)
+            return True
+        except ClientError:
+            # Not a full key (404) or HEAD not permitted - try a listing
+            pass
+    
     response = s3.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1)
     return 'Contents' in response
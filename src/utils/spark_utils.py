@@ -1,5 +1,7 @@
 """Utility functions for Spark operations in AWS Glue."""
 
+from functools import reduce
+from operator import and_
 from pyspark.sql import SparkSession, DataFrame
 from pyspark.sql import functions as F
 from pyspark.sql.types import StructType
@@ -25,7 +27,12 @@ def get_spark_session(app_name: str = "GlueETL") -> SparkSession:
     return (SparkSession.builder
             .appName(app_name)
             .config("spark.sql.sources.partitionOverwriteMode", "dynamic")
-            .config("spark.sql.parquet.compression.codec", "snappy")
+            # zstd level 3 writes noticeably smaller files than snappy
+            .config("spark.sql.parquet.compression.codec", "zstd")
+            .config("spark.hadoop.parquet.compression.codec.zstd.level", "3")
+            # Caps file size; same 4M-row target as the Silver job
+            # (TARGET_ROWS_PER_FILE, roughly 50-180MB for these tables)
+            .config("spark.sql.files.maxRecordsPerFile", "4000000")
             .getOrCreate())
 
 
@@ -63,7 +70,8 @@ def write_parquet_partitioned(
     df: DataFrame,
     path: str,
     partition_cols: List[str],
-    mode: str = "overwrite"
+    mode: str = "overwrite",
+    sort_within: Optional[List[str]] = None
 ) -> None:
     """
     Write DataFrame to Parquet format with partitioning.
@@ -78,7 +86,12 @@ def write_parquet_partitioned(
         path: Output path (S3 or local)
         partition_cols: Columns to partition by
         mode: Write mode (overwrite, append, etc.)
+        sort_within: Optional columns to sort by within each partition,
+            which improves dictionary/RLE compression and min/max stats
     """
+    if sort_within:
+        df = df.sortWithinPartitions(*sort_within)
+    
     (df.write
      .mode(mode)
      .partitionBy(partition_cols)
@@ -103,10 +116,7 @@ def add_metadata_columns(df: DataFrame, source_file: str = "unknown") -> DataFra
     Returns:
         DataFrame with metadata columns added
     """
-    return (df
-            .withColumn("_ingested_at", F.current_timestamp())
-            .withColumn("_source_file", F.lit(source_file))
-            .withColumn("_processing_date", F.current_date()))
+    return apply_transforms(df, source_file=source_file)
 
 
 def deduplicate_by_key(
@@ -122,6 +132,9 @@ def deduplicate_by_key(
     - Source systems may send duplicate events
     - We want to keep the latest version of each record
     
+    Among rows that tie on the order column exactly one is kept, but
+    which one is not defined.
+    
     Args:
         df: Input DataFrame with potential duplicates
         key_columns: Columns that define uniqueness
@@ -147,6 +160,10 @@ def cast_columns(df: DataFrame, column_types: dict) -> DataFrame:
     """
     Cast multiple columns to specified types.
     
+    All casts land in one projection, the same plan as a selectExpr of
+    "CAST(c AS t) AS c" strings, so types may be given either as Spark
+    SQL type strings ("decimal(10,2)") or as DataType instances.
+    
     Args:
         df: Input DataFrame
         column_types: Dictionary mapping column names to types
@@ -154,10 +171,7 @@ def cast_columns(df: DataFrame, column_types: dict) -> DataFrame:
     Returns:
         DataFrame with cast columns
     """
-    for col_name, col_type in column_types.items():
-        if col_name in df.columns:
-            df = df.withColumn(col_name, F.col(col_name).cast(col_type))
-    return df
+    return apply_transforms(df, column_types=column_types)
 
 
 def null_safe_trim(df: DataFrame, columns: List[str]) -> DataFrame:
@@ -171,10 +185,56 @@ def null_safe_trim(df: DataFrame, columns: List[str]) -> DataFrame:
     Returns:
         DataFrame with trimmed columns
     """
-    for col_name in columns:
-        if col_name in df.columns:
-            df = df.withColumn(col_name, F.trim(F.col(col_name)))
-    return df
+    return apply_transforms(df, trim_columns=columns)
+
+
+def apply_transforms(
+    df: DataFrame,
+    *,
+    column_types: Optional[dict] = None,
+    trim_columns: Optional[List[str]] = None,
+    source_file: Optional[str] = None
+) -> DataFrame:
+    """
+    Trim, cast and add metadata columns in a single projection.
+    
+    Chaining withColumn adds one plan node (and one analyzer pass) per
+    column; building one select keeps the plan flat on wide schemas.
+    Columns that are both trimmed and cast are trimmed first.
+    
+    Args:
+        df: Input DataFrame
+        column_types: Dictionary mapping column names to types
+        trim_columns: List of column names to trim
+        source_file: If given, add metadata columns with this source file
+        
+    Returns:
+        Transformed DataFrame
+    """
+    column_types = column_types or {}
+    trim_columns = set(trim_columns or [])
+    
+    metadata_exprs = []
+    if source_file is not None:
+        metadata_exprs = [
+            F.current_timestamp().alias("_ingested_at"),
+            F.lit(source_file).alias("_source_file"),
+            F.current_date().alias("_processing_date"),
+        ]
+    metadata_names = {"_ingested_at", "_source_file", "_processing_date"}
+    
+    exprs = []
+    for col_name in df.columns:
+        if metadata_exprs and col_name in metadata_names:
+            continue
+        expr = F.col(col_name)
+        if col_name in trim_columns:
+            expr = F.trim(expr)
+        if col_name in column_types:
+            expr = expr.cast(column_types[col_name])
+        exprs.append(expr.alias(col_name))
+    
+    return df.select(*exprs, *metadata_exprs)
 
 
 def validate_not_null(df: DataFrame, columns: List[str]) -> DataFrame:
@@ -190,14 +250,20 @@ def validate_not_null(df: DataFrame, columns: List[str]) -> DataFrame:
     Returns:
         Filtered DataFrame
     """
-    original_count = df.count()
+    if not columns:
+        return df
+    
+    condition = reduce(and_, (F.col(c).isNotNull() for c in columns))
     
-    condition = F.lit(True)
-    for col_name in columns:
-        condition = condition & F.col(col_name).isNotNull()
+    # Original and surviving row counts from a single pass over the data
+    stats = df.select(
+        F.count(F.lit(1)).alias("n"),
+        F.sum(condition.cast("long")).alias("k")
+    ).first()
+    original_count = stats.n
+    filtered_count = stats.k or 0
     
     filtered_df = df.filter(condition)
-    filtered_count = filtered_df.count()
     
     removed = original_count - filtered_count
     if removed > 0:
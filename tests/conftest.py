@@ -12,6 +12,7 @@ Use fixtures to avoid repeating setup code in each test.
 
 import os
 import sys
+import pyarrow as pa
 import pytest
 from datetime import datetime
 from pathlib import Path
@@ -21,21 +22,41 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
 @pytest.fixture(scope="session")
-def spark():
+def spark(tmp_path_factory):
     """
     Create a Spark session for testing.
     
     scope="session" means this fixture is created once per test session,
     not once per test. This is more efficient for Spark.
+    
+    Under pytest-xdist every worker is its own session, so each gets a
+    separate spark.local.dir to keep shuffle and cache files apart.
     """
     from pyspark.sql import SparkSession
     
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    local_dir = tmp_path_factory.mktemp(f"spark-{worker}")
+    
     spark = (SparkSession.builder
-             .appName("TestSession")
+             .appName(f"TestSession-{worker}")
              .master("local[2]")
+             .config("spark.local.dir", str(local_dir))
              .config("spark.sql.shuffle.partitions", "2")
-             .config("spark.driver.memory", "2g")
+             .config("spark.driver.memory", "1g")
+             .config("spark.sql.execution.arrow.pyspark.enabled", "true")
+             # Tiny test data: skip AQE re-planning and keep 2 tasks per stage
+             .config("spark.sql.adaptive.enabled", "false")
+             .config("spark.sql.autoBroadcastJoinThreshold", "10485760")
+             .config("spark.default.parallelism", "2")
+             # No UI, progress bar, event log or executor allocation to start
+             .config("spark.ui.enabled", "false")
+             .config("spark.ui.showConsoleProgress", "false")
+             .config("spark.eventLog.enabled", "false")
+             .config("spark.dynamicAllocation.enabled", "false")
+             .config("spark.sql.catalogImplementation", "in-memory")
+             .config("spark.sql.codegen.wholeStage", "true")
              .getOrCreate())
+    spark.sparkContext.setLogLevel("WARN")
     
     yield spark
     
@@ -43,10 +64,15 @@ def spark():
     spark.stop()
 
 
-@pytest.fixture
+# Sample data and the DataFrames built from it are shared by the whole
+# session. The data are immutable Arrow tables: tests that need altered
+# rows build a new table (set_column, concat_tables) rather than editing.
+
+
+@pytest.fixture(scope="session")
 def sample_customers_data():
     """Sample customer data for testing."""
-    return [
+    return pa.Table.from_pylist([
         {
             "customer_id": "CUST-001",
             "email": "john.doe@example.com",
@@ -71,13 +97,13 @@ def sample_customers_data():
             "created_at": "2023-06-20T15:45:00",
             "updated_at": "2023-07-01T09:00:00",
         },
-    ]
+    ])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_products_data():
     """Sample product data for testing."""
-    return [
+    return pa.Table.from_pylist([
         {
             "product_id": "PROD-001",
             "sku": "SAM-ELE-0001",
@@ -106,13 +132,13 @@ def sample_products_data():
             "is_active": "true",
             "created_at": "2023-02-15T00:00:00",
         },
-    ]
+    ])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_orders_data():
     """Sample order data for testing."""
-    return [
+    return pa.Table.from_pylist([
         {
             "order_id": "ORD-001",
             "customer_id": "CUST-001",
@@ -143,13 +169,13 @@ def sample_orders_data():
             "shipping_country": "FR",
             "shipping_city": "Paris",
         },
-    ]
+    ])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_order_items_data():
     """Sample order items data for testing."""
-    return [
+    return pa.Table.from_pylist([
         {
             "order_item_id": "ITEM-001",
             "order_id": "ORD-001",
@@ -168,31 +194,51 @@ def sample_order_items_data():
             "discount_percent": "0",
             "line_total": "129.99",
         },
-    ]
+    ])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def customers_df(spark, sample_customers_data):
     """Create a customers DataFrame for testing."""
-    return spark.createDataFrame(sample_customers_data)
+    from tests.schemas import CUSTOMERS_SCHEMA
+    
+    df = spark.createDataFrame(sample_customers_data.to_pandas(),
+                               schema=CUSTOMERS_SCHEMA)
+    df.cache().count()
+    return df
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def products_df(spark, sample_products_data):
     """Create a products DataFrame for testing."""
-    return spark.createDataFrame(sample_products_data)
+    from tests.schemas import PRODUCTS_SCHEMA
+    
+    df = spark.createDataFrame(sample_products_data.to_pandas(),
+                               schema=PRODUCTS_SCHEMA)
+    df.cache().count()
+    return df
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def orders_df(spark, sample_orders_data):
     """Create an orders DataFrame for testing."""
-    return spark.createDataFrame(sample_orders_data)
+    from tests.schemas import ORDERS_SCHEMA
+    
+    df = spark.createDataFrame(sample_orders_data.to_pandas(),
+                               schema=ORDERS_SCHEMA)
+    df.cache().count()
+    return df
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def order_items_df(spark, sample_order_items_data):
     """Create an order items DataFrame for testing."""
-    return spark.createDataFrame(sample_order_items_data)
+    from tests.schemas import ORDER_ITEMS_SCHEMA
+    
+    df = spark.createDataFrame(sample_order_items_data.to_pandas(),
+                               schema=ORDER_ITEMS_SCHEMA)
+    df.cache().count()
+    return df
 
 
 @pytest.fixture
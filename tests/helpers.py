@@ -0,0 +1,30 @@
+"""
+Helpers shared by the Spark tests.
+
+Kept out of conftest.py, which pytest loads itself and which test
+modules should not import directly.
+"""
+
+from datetime import datetime
+
+from pyspark.sql import functions as F
+
+
+# Ingestion time stamped on test Bronze rows; the value itself is irrelevant
+INGESTED_AT = datetime(2024, 1, 1)
+
+
+def with_metadata(df):
+    """
+    Add the Bronze metadata columns the Silver transforms expect.
+    
+    Both columns go into one select, so the plan gets a single
+    projection instead of one per chained withColumn. The ingestion time
+    is a fixed literal rather than current_timestamp(), so Catalyst can
+    fold it and test runs are reproducible.
+    """
+    return df.select(
+        "*",
+        F.lit(INGESTED_AT).cast("timestamp").alias("_ingested_at"),
+        F.lit("test.csv").alias("_source_file"),
+    )
@@ -0,0 +1,64 @@
+"""
+Explicit Spark schemas for the sample test data.
+
+These mirror the Bronze schemas: every source column is a string, parsed
+and cast in the Silver layer. Passing them to createDataFrame skips
+Python-side schema inference and keeps None values typed.
+"""
+
+from pyspark.sql.types import StructType, StructField, StringType
+
+
+CUSTOMERS_SCHEMA = StructType([
+    StructField("customer_id", StringType(), True),
+    StructField("email", StringType(), True),
+    StructField("first_name", StringType(), True),
+    StructField("last_name", StringType(), True),
+    StructField("phone", StringType(), True),
+    StructField("country", StringType(), True),
+    StructField("city", StringType(), True),
+    StructField("address", StringType(), True),
+    StructField("created_at", StringType(), True),
+    StructField("updated_at", StringType(), True),
+])
+
+PRODUCTS_SCHEMA = StructType([
+    StructField("product_id", StringType(), True),
+    StructField("sku", StringType(), True),
+    StructField("name", StringType(), True),
+    StructField("description", StringType(), True),
+    StructField("category", StringType(), True),
+    StructField("subcategory", StringType(), True),
+    StructField("brand", StringType(), True),
+    StructField("price", StringType(), True),
+    StructField("cost", StringType(), True),
+    StructField("stock_quantity", StringType(), True),
+    StructField("is_active", StringType(), True),
+    StructField("created_at", StringType(), True),
+])
+
+ORDERS_SCHEMA = StructType([
+    StructField("order_id", StringType(), True),
+    StructField("customer_id", StringType(), True),
+    StructField("order_date", StringType(), True),
+    StructField("status", StringType(), True),
+    StructField("payment_method", StringType(), True),
+    StructField("subtotal", StringType(), True),
+    StructField("tax_amount", StringType(), True),
+    StructField("shipping_amount", StringType(), True),
+    StructField("discount_amount", StringType(), True),
+    StructField("total_amount", StringType(), True),
+    StructField("currency", StringType(), True),
+    StructField("shipping_country", StringType(), True),
+    StructField("shipping_city", StringType(), True),
+])
+
+ORDER_ITEMS_SCHEMA = StructType([
+    StructField("order_item_id", StringType(), True),
+    StructField("order_id", StringType(), True),
+    StructField("product_id", StringType(), True),
+    StructField("quantity", StringType(), True),
+    StructField("unit_price", StringType(), True),
+    StructField("discount_percent", StringType(), True),
+    StructField("line_total", StringType(), True),
+])
@@ -148,6 +148,35 @@ class TestEcommerceDataGenerator:
         assert os.path.exists(files["products"])
         assert os.path.exists(files["orders"])
         assert os.path.exists(files["order_items"])
+    
+    def test_save_to_parquet(self, tmp_path):
+        """Test saving data to Parquet files."""
+        import pyarrow.parquet as pq
+        from src.data_generator.generator import EcommerceDataGenerator
+        
+        generator = EcommerceDataGenerator(
+            num_customers=5,
+            num_products=5,
+            num_orders=10
+        )
+        
+        generator.generate_all()
+        files = generator.save_to_parquet(str(tmp_path))
+        
+        assert set(files) == {"customers", "products", "orders", "order_items"}
+        
+        # Check row counts and that every column is stored as a string,
+        # matching the all-string Bronze schemas
+        customers = pq.read_table(files["customers"])
+        assert customers.num_rows == 5
+        for name in files:
+            schema = pq.read_schema(files[name])
+            assert {str(field.type) for field in schema} == {"string"}
+        
+        # Values match the CSV text form
+        products = pq.read_table(files["products"]).to_pylist()
+        assert products[0]["is_active"] in ("true", "false")
+        float(products[0]["price"])
 
 
 class TestSchemas:
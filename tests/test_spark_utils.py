@@ -0,0 +1,109 @@
+"""Tests for Spark utility functions."""
+
+import pytest
+
+pytest.importorskip("pyspark")
+
+from src.utils.spark_utils import apply_transforms, deduplicate_by_key
+
+
+SCHEMA = "id string, version int, value string"
+
+
+class TestDeduplicateByKey:
+    """Tests for keeping one record per key."""
+    
+    def test_keeps_latest(self, spark):
+        """Test that the highest order value wins by default."""
+        df = spark.createDataFrame(
+            [("A", 1, "old"), ("A", 2, "new"), ("B", 1, "only")], SCHEMA)
+        
+        result = deduplicate_by_key(df, ["id"], "version")
+        rows = {r.id: r.value for r in result.collect()}
+        assert rows == {"A": "new", "B": "only"}
+    
+    def test_keeps_earliest_when_ascending(self, spark):
+        """Test that ascending=True keeps the lowest order value."""
+        df = spark.createDataFrame(
+            [("A", 1, "old"), ("A", 2, "new")], SCHEMA)
+        
+        result = deduplicate_by_key(df, ["id"], "version", ascending=True)
+        assert [r.value for r in result.collect()] == ["old"]
+    
+    @pytest.mark.parametrize("ascending, expected", [
+        (False, "known"),
+        (True, "unknown"),
+    ])
+    def test_null_order_value_sorts_first_ascending(self, spark, ascending,
+                                                    expected):
+        """Test Spark's default null ordering: last descending, first ascending."""
+        df = spark.createDataFrame(
+            [("A", None, "unknown"), ("A", 1, "known")], SCHEMA)
+        
+        result = deduplicate_by_key(df, ["id"], "version", ascending=ascending)
+        assert [r.value for r in result.collect()] == [expected]
+    
+    def test_all_null_order_values_keep_one_row(self, spark):
+        """Test that a key whose order values are all null is not dropped."""
+        df = spark.createDataFrame(
+            [("A", None, "x"), ("A", None, "y")], SCHEMA)
+        
+        result = deduplicate_by_key(df, ["id"], "version")
+        assert result.count() == 1
+    
+    def test_ties_keep_exactly_one_row(self, spark):
+        """Test that rows tied on the order value collapse to one."""
+        df = spark.createDataFrame(
+            [("A", 2, "x"), ("A", 2, "y"), ("A", 1, "z")], SCHEMA)
+        
+        rows = deduplicate_by_key(df, ["id"], "version").collect()
+        assert len(rows) == 1
+        assert rows[0].version == 2
+        assert rows[0].value in {"x", "y"}
+    
+    def test_output_columns_unchanged(self, spark):
+        """Test that the helper row-number column is dropped."""
+        df = spark.createDataFrame([("A", 1, "x")], SCHEMA)
+        
+        result = deduplicate_by_key(df, ["id"], "version")
+        assert result.columns == df.columns
+
+
+class TestApplyTransforms:
+    """Tests for trimming, casting and adding metadata in one projection."""
+    
+    def test_trims_before_casting(self, spark):
+        """Test that a trimmed and cast column keeps the cast type."""
+        df = spark.createDataFrame([(" 12 ",)], "qty string")
+        
+        result = apply_transforms(df, column_types={"qty": "int"},
+                                  trim_columns=["qty"])
+        
+        # Trimming after the cast would turn the column back into a string
+        assert result.schema["qty"].dataType.simpleString() == "int"
+        assert result.first().qty == 12
+    
+    def test_unknown_columns_ignored(self, spark):
+        """Test that names missing from the DataFrame are skipped."""
+        df = spark.createDataFrame([(" a ",)], "name string")
+        
+        result = apply_transforms(df, column_types={"missing": "int"},
+                                  trim_columns=["other"])
+        
+        assert result.columns == ["name"]
+        assert result.first().name == " a "
+    
+    def test_metadata_columns_replaced(self, spark):
+        """Test that existing metadata columns are replaced, not duplicated."""
+        df = spark.createDataFrame(
+            [("A", None, "old.csv", None)],
+            "id string, _ingested_at timestamp, _source_file string, "
+            "_processing_date date")
+        
+        result = apply_transforms(df, source_file="new.csv")
+        
+        assert sorted(result.columns) == sorted(df.columns)
+        row = result.first()
+        assert row._source_file == "new.csv"
+        assert row._ingested_at is not None
+        assert row._processing_date is not None
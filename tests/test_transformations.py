@@ -1,237 +1,380 @@
 """Tests for data transformation functions."""
 
+import pyarrow as pa
 import pytest
+
+pytest.importorskip("pyspark")
+# transform_to_silver is a Glue job script and imports awsglue at load time
+pytest.importorskip("awsglue")
+
 from pyspark.sql import functions as F
 
+from src.glue_jobs.silver.transform_to_silver import (
+    count_and_check_qc,
+    drop_qc_columns,
+    transform_customers,
+    transform_products,
+    transform_orders,
+    transform_order_items,
+    write_silver,
+)
+from tests.helpers import with_metadata
+from tests.schemas import CUSTOMERS_SCHEMA, ORDERS_SCHEMA
 
-class TestCustomerTransformations:
-    """Tests for customer data transformations."""
+
+def _with_value(table, column, row, value):
+    """Return a copy of an Arrow table with one string cell replaced."""
+    values = table.column(column).to_pylist()
+    values[row] = value
+    return table.set_column(table.schema.get_field_index(column), column,
+                            pa.array(values, pa.string()))
+
+
+def _silver_orders(spark, sample_orders_data, rows):
+    """
+    Build Silver orders, without QC columns, from (id, date, status) rows.
     
-    def test_email_lowercase(self, spark, sample_customers_data):
-        """Test that emails are converted to lowercase."""
-        from src.glue_jobs.silver.transform_to_silver import transform_customers
-        
-        # Add a customer with uppercase email
-        data = sample_customers_data.copy()
-        data[0]["email"] = "JOHN.DOE@EXAMPLE.COM"
-        
-        # Add required metadata columns
-        df = spark.createDataFrame(data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_customers(df)
-        
-        # Check email is lowercase
-        emails = [row.email for row in result.collect()]
-        assert "john.doe@example.com" in emails
+    Every other field is copied from the first sample order.
+    """
+    template = sample_orders_data.slice(0, 1).to_pylist()[0]
+    data = pa.Table.from_pylist([
+        dict(template, order_id=order_id, order_date=order_date, status=status)
+        for order_id, order_date, status in rows
+    ], schema=sample_orders_data.schema)
     
-    def test_email_domain_extraction(self, spark, sample_customers_data):
-        """Test that email domain is correctly extracted."""
-        from src.glue_jobs.silver.transform_to_silver import transform_customers
-        
-        df = spark.createDataFrame(sample_customers_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_customers(df)
-        
-        # Check email domain extraction
-        row = result.filter(F.col("email") == "john.doe@example.com").first()
-        assert row.email_domain == "example.com"
+    df = with_metadata(
+        spark.createDataFrame(data.to_pandas(), schema=ORDERS_SCHEMA))
+    return drop_qc_columns(transform_orders(df), "orders")
+
+
+def _write_orders(spark, df, path, processing_date=None):
+    """Write Silver orders and read the table back keyed by order_id."""
+    write_silver(spark, df, str(path), "orders", df.count(), processing_date)
+    return {row.order_id: row for row in spark.read.parquet(str(path)).collect()}
+
+
+def _transformed(transform, df):
+    """Run a transform once and cache the result for a module's tests."""
+    result = transform(with_metadata(df)).cache()
+    result.count()
+    return result
+
+
+@pytest.fixture(scope="module")
+def normalized_customers(spark, sample_customers_data):
+    """
+    Silver customers keyed by customer_id, from input needing normalization.
     
-    def test_full_name_creation(self, spark, sample_customers_data):
-        """Test that full name is correctly created."""
-        from src.glue_jobs.silver.transform_to_silver import transform_customers
-        
-        df = spark.createDataFrame(sample_customers_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_customers(df)
-        
-        # Check full name
-        row = result.filter(F.col("customer_id") == "CUST-001").first()
-        assert row.full_name == "John Doe"
+    CUST-001 arrives with an uppercase email and a lowercase country, so a
+    single transform and collect covers every customer normalization check.
+    """
+    data = _with_value(sample_customers_data, "email", 0, "JOHN.DOE@EXAMPLE.COM")
+    data = _with_value(data, "country", 0, "de")
     
-    def test_country_uppercase(self, spark, sample_customers_data):
-        """Test that country codes are uppercase."""
-        from src.glue_jobs.silver.transform_to_silver import transform_customers
-        
-        # Add lowercase country
-        data = sample_customers_data.copy()
-        data[0]["country"] = "de"
-        
-        df = spark.createDataFrame(data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_customers(df)
-        
-        row = result.filter(F.col("customer_id") == "CUST-001").first()
-        assert row.country == "DE"
+    df = with_metadata(
+        spark.createDataFrame(data.to_pandas(), schema=CUSTOMERS_SCHEMA))
+    
+    return {row.customer_id: row for row in transform_customers(df).collect()}
+
+
+@pytest.fixture(scope="module")
+def transformed_products(products_df):
+    """Silver products, transformed once for the read-only tests."""
+    result = _transformed(transform_products, products_df)
+    yield result
+    result.unpersist()
+
+
+@pytest.fixture(scope="module")
+def transformed_orders(orders_df):
+    """Silver orders, transformed once for the read-only tests."""
+    result = _transformed(transform_orders, orders_df)
+    yield result
+    result.unpersist()
+
+
+@pytest.fixture(scope="module")
+def transformed_order_items(order_items_df):
+    """Silver order items, transformed once for the read-only tests."""
+    result = _transformed(transform_order_items, order_items_df)
+    yield result
+    result.unpersist()
+
+
+class TestCustomerTransformations:
+    """Tests for customer data transformations."""
+    
+    @pytest.mark.parametrize("column, customer_id, expected", [
+        ("email", "CUST-001", "john.doe@example.com"),
+        ("email_domain", "CUST-001", "example.com"),
+        ("full_name", "CUST-001", "John Doe"),
+        ("country", "CUST-001", "DE"),
+    ])
+    def test_customer_normalization(self, normalized_customers,
+                                    column, customer_id, expected):
+        """Test email lowercasing, domain extraction, full name and country."""
+        row = normalized_customers[customer_id]
+        assert row[column] == expected
     
     def test_deduplication(self, spark, sample_customers_data):
         """Test that duplicate customers are removed."""
-        from src.glue_jobs.silver.transform_to_silver import transform_customers
-        
         # Create duplicate customer
-        data = sample_customers_data.copy()
-        duplicate = data[0].copy()
-        duplicate["email"] = "updated@example.com"  # Different email, same ID
-        data.append(duplicate)
+        duplicate = _with_value(sample_customers_data.slice(0, 1),
+                                "email", 0, "updated@example.com")  # Same ID
+        data = pa.concat_tables([sample_customers_data, duplicate])
         
-        df = spark.createDataFrame(data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
+        df = with_metadata(
+            spark.createDataFrame(data.to_pandas(), schema=CUSTOMERS_SCHEMA))
         
         result = transform_customers(df)
         
         # Should only have 2 customers (original data had 2 unique customer_ids)
-        assert result.count() == 2
+        n = result.agg(F.count(F.lit(1)).alias("n")).first().n
+        assert n == 2
 
 
 class TestProductTransformations:
     """Tests for product data transformations."""
     
-    def test_price_casting(self, spark, sample_products_data):
+    def test_price_casting(self, transformed_products):
         """Test that price is cast to double."""
-        from src.glue_jobs.silver.transform_to_silver import transform_products
-        
-        df = spark.createDataFrame(sample_products_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_products(df)
+        result = transformed_products
         
         # Check price type
         price_type = result.schema["price"].dataType.simpleString()
         assert price_type == "double"
         
         # Check value
-        row = result.filter(F.col("product_id") == "PROD-001").first()
+        row = (result
+               .filter(F.col("product_id") == "PROD-001")
+               .select("price")
+               .first())
         assert row.price == 599.99
     
-    def test_margin_calculation(self, spark, sample_products_data):
+    def test_margin_calculation(self, transformed_products):
         """Test that margin percentage is correctly calculated."""
-        from src.glue_jobs.silver.transform_to_silver import transform_products
-        
-        df = spark.createDataFrame(sample_products_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_products(df)
+        result = transformed_products
         
-        row = result.filter(F.col("product_id") == "PROD-001").first()
+        row = (result
+               .filter(F.col("product_id") == "PROD-001")
+               .select("margin_percent")
+               .first())
         
         # Expected margin: (599.99 - 350.00) / 599.99 * 100 = 41.67%
         expected_margin = round((599.99 - 350.00) / 599.99 * 100, 2)
-        assert abs(row.margin_percent - expected_margin) < 0.01
+        assert row.margin_percent == pytest.approx(expected_margin, abs=0.01)
     
-    def test_boolean_parsing(self, spark, sample_products_data):
+    def test_boolean_parsing(self, transformed_products):
         """Test that is_active is correctly parsed to boolean."""
-        from src.glue_jobs.silver.transform_to_silver import transform_products
+        result = transformed_products
         
-        df = spark.createDataFrame(sample_products_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_products(df)
-        
-        row = result.filter(F.col("product_id") == "PROD-001").first()
+        row = (result
+               .filter(F.col("product_id") == "PROD-001")
+               .select("is_active")
+               .first())
         assert row.is_active == True
 
 
 class TestOrderTransformations:
     """Tests for order data transformations."""
     
-    def test_date_parsing(self, spark, sample_orders_data):
+    def test_date_parsing(self, transformed_orders):
         """Test that order_date is parsed correctly."""
-        from src.glue_jobs.silver.transform_to_silver import transform_orders
-        
-        df = spark.createDataFrame(sample_orders_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_orders(df)
+        result = transformed_orders
         
         # Check date type
         date_type = result.schema["order_date"].dataType.simpleString()
         assert "timestamp" in date_type
     
-    def test_date_components(self, spark, sample_orders_data):
+    def test_date_components(self, transformed_orders):
         """Test that date components are correctly extracted."""
-        from src.glue_jobs.silver.transform_to_silver import transform_orders
+        result = transformed_orders
         
-        df = spark.createDataFrame(sample_orders_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_orders(df)
-        
-        row = result.filter(F.col("order_id") == "ORD-001").first()
+        row = (result
+               .filter(F.col("order_id") == "ORD-001")
+               .select("order_year", "order_month", "order_day")
+               .first())
         assert row.order_year == 2023
         assert row.order_month == 12
         assert row.order_day == 1
     
     def test_status_lowercase(self, spark, sample_orders_data):
         """Test that status is lowercase."""
-        from src.glue_jobs.silver.transform_to_silver import transform_orders
-        
-        data = sample_orders_data.copy()
-        data[0]["status"] = "DELIVERED"
+        data = _with_value(sample_orders_data, "status", 0, "DELIVERED")
         
-        df = spark.createDataFrame(data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
+        df = with_metadata(
+            spark.createDataFrame(data.to_pandas(), schema=ORDERS_SCHEMA))
         
         result = transform_orders(df)
         
-        row = result.filter(F.col("order_id") == "ORD-001").first()
+        row = (result
+               .filter(F.col("order_id") == "ORD-001")
+               .select("status")
+               .first())
         assert row.status == "delivered"
+    
+    @pytest.mark.parametrize("column, raw, expected", [
+        ("status", "Canceled", "cancelled"),
+        ("payment_method", " Credit Card ", "credit_card"),
+        ("payment_method", "CC", "credit_card"),
+        ("payment_method", "cod", "cash_on_delivery"),
+        ("status", "On_Hold", "on_hold"),
+        ("payment_method", "Voucher", "voucher"),
+        ("status", None, None),
+        ("payment_method", None, None),
+    ])
+    def test_canonical_values(self, spark, sample_orders_data,
+                              column, raw, expected):
+        """Test alias mapping, pass-through of unknown values and nulls."""
+        data = _with_value(sample_orders_data, column, 0, raw)
+        
+        df = with_metadata(
+            spark.createDataFrame(data.to_pandas(), schema=ORDERS_SCHEMA))
+        
+        row = (transform_orders(df)
+               .filter(F.col("order_id") == "ORD-001")
+               .select(column)
+               .first())
+        assert row[column] == expected
 
 
 class TestOrderItemTransformations:
     """Tests for order item data transformations."""
     
-    def test_quantity_casting(self, spark, sample_order_items_data):
+    def test_quantity_casting(self, transformed_order_items):
         """Test that quantity is cast to integer."""
-        from src.glue_jobs.silver.transform_to_silver import transform_order_items
-        
-        df = spark.createDataFrame(sample_order_items_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
-        
-        result = transform_order_items(df)
+        result = transformed_order_items
         
         # Check quantity type
         qty_type = result.schema["quantity"].dataType.simpleString()
         assert qty_type == "int"
     
-    def test_gross_amount_calculation(self, spark, sample_order_items_data):
+    def test_gross_amount_calculation(self, transformed_order_items):
         """Test that gross_amount is correctly calculated."""
-        from src.glue_jobs.silver.transform_to_silver import transform_order_items
+        result = transformed_order_items
         
-        df = spark.createDataFrame(sample_order_items_data)
-        df = (df
-              .withColumn("_ingested_at", F.current_timestamp())
-              .withColumn("_source_file", F.lit("test.csv")))
+        row = (result
+               .filter(F.col("order_item_id") == "ITEM-001")
+               .select("gross_amount")
+               .first())
+        
+        # quantity * unit_price = 1 * 599.99 = 599.99
+        assert row.gross_amount == pytest.approx(599.99, rel=1e-9)
+
+
+class TestWriteSilverOrders:
+    """Tests for full and incremental writes of partitioned Silver orders."""
+    
+    def test_first_load(self, spark, sample_orders_data, tmp_path):
+        """Test that an incremental run into an empty path writes all rows."""
+        target = tmp_path / "orders"
+        df = _silver_orders(spark, sample_orders_data, [
+            ("ORD-001", "2023-12-01T10:00:00", "pending"),
+            ("ORD-002", "2023-11-05T10:00:00", "shipped"),
+        ])
+        
+        rows = _write_orders(spark, df, target, "2023-12-01")
+        
+        assert set(rows) == {"ORD-001", "ORD-002"}
+        assert (target / "order_year=2023" / "order_month=12").is_dir()
+        assert (target / "order_year=2023" / "order_month=11").is_dir()
+    
+    def test_incremental_replaces_by_key(self, spark, sample_orders_data,
+                                         tmp_path):
+        """Test that new rows replace stored ones and the rest survive."""
+        target = tmp_path / "orders"
+        _write_orders(spark, _silver_orders(spark, sample_orders_data, [
+            ("ORD-001", "2023-12-01T10:00:00", "pending"),
+            ("ORD-002", "2023-12-15T10:00:00", "shipped"),
+            ("ORD-003", "2023-11-05T10:00:00", "delivered"),
+        ]), target)
+        
+        rows = _write_orders(spark, _silver_orders(spark, sample_orders_data, [
+            ("ORD-001", "2023-12-01T10:00:00", "delivered"),
+            ("ORD-004", "2023-12-20T10:00:00", "pending"),
+        ]), target, "2023-12-20")
+        
+        assert set(rows) == {"ORD-001", "ORD-002", "ORD-003", "ORD-004"}
+        assert len(spark.read.parquet(str(target)).collect()) == 4
+        assert rows["ORD-001"].status == "delivered"
+        # Same month as the new batch, not in it
+        assert rows["ORD-002"].status == "shipped"
+        # Month untouched by the new batch
+        assert rows["ORD-003"].status == "delivered"
+    
+    def test_null_partition_rows_survive(self, spark, sample_orders_data,
+                                         tmp_path):
+        """Test that stored orders without a date survive a new one."""
+        target = tmp_path / "orders"
+        _write_orders(spark, _silver_orders(spark, sample_orders_data, [
+            ("ORD-001", "2023-12-01T10:00:00", "pending"),
+            ("ORD-N1", None, "pending"),
+        ]), target)
+        
+        rows = _write_orders(spark, _silver_orders(spark, sample_orders_data, [
+            ("ORD-N2", None, "pending"),
+        ]), target, "2023-12-20")
+        
+        assert set(rows) == {"ORD-001", "ORD-N1", "ORD-N2"}
+        assert rows["ORD-N1"].order_year is None
+    
+    def test_unpartitioned_table_is_rewritten(self, spark, sample_orders_data,
+                                              tmp_path):
+        """Test that an incremental run upgrades a flat table in full."""
+        target = tmp_path / "orders"
+        _silver_orders(spark, sample_orders_data, [
+            ("ORD-001", "2023-12-01T10:00:00", "pending"),
+            ("ORD-002", "2023-11-05T10:00:00", "shipped"),
+        ]).write.parquet(str(target))
+        
+        rows = _write_orders(spark, _silver_orders(spark, sample_orders_data, [
+            ("ORD-001", "2023-12-01T10:00:00", "delivered"),
+        ]), target, "2023-12-20")
+        
+        assert set(rows) == {"ORD-001", "ORD-002"}
+        assert rows["ORD-001"].status == "delivered"
+        assert not list(target.glob("*.parquet"))
+
+
+class TestSilverQcColumns:
+    """Tests for checking and dropping the QC-only columns."""
+    
+    @pytest.mark.parametrize("table, qc_columns", [
+        ("orders", ["calculated_total", "is_total_valid"]),
+        ("order_items", ["calculated_line_total", "is_line_total_valid"]),
+    ])
+    def test_qc_columns_dropped(self, transformed_orders,
+                                transformed_order_items, table, qc_columns):
+        """Test that Silver output keeps only business columns."""
+        df = {"orders": transformed_orders,
+              "order_items": transformed_order_items}[table]
+        
+        result = drop_qc_columns(df, table)
+        
+        assert not set(qc_columns) & set(result.columns)
+        assert result.columns == [c for c in df.columns if c not in qc_columns]
+    
+    def test_table_without_qc_columns_unchanged(self, transformed_products):
+        """Test that tables without QC columns are returned as-is."""
+        result = drop_qc_columns(transformed_products, "products")
+        assert result is transformed_products
+    
+    def test_count_and_mismatches(self, spark, sample_orders_data, caplog):
+        """Test the row count and the logged number of invalid totals."""
+        data = _with_value(sample_orders_data, "total_amount", 0, "1.00")
+        df = transform_orders(with_metadata(
+            spark.createDataFrame(data.to_pandas(), schema=ORDERS_SCHEMA)))
         
-        result = transform_order_items(df)
+        with caplog.at_level("WARNING"):
+            count = count_and_check_qc(df, "orders")
         
-        row = result.filter(F.col("order_item_id") == "ITEM-001").first()
+        assert count == 2
+        assert "orders: 1 records failed is_total_valid" in caplog.text
+    
+    def test_count_without_mismatches(self, transformed_products, caplog):
+        """Test that a table without a QC flag is counted and not warned about."""
+        with caplog.at_level("WARNING"):
+            count = count_and_check_qc(transformed_products, "products")
         
-        # quantity * unit_price = 1 * 599.99 = 599.99
-        assert row.gross_amount == 599.99
+        assert count == 2
+        assert "records failed" not in caplog.text
@@ -0,0 +1,166 @@
+"""Tests for data quality validators."""
+
+import pytest
+
+pytest.importorskip("pyspark")
+
+from src.quality import CheckSeverity, DataQualityValidator
+from src.quality.validators import _should_broadcast
+
+
+SCHEMA = "id string, email string, amount double"
+
+ROWS = [
+    ("A", "a@example.com", 10.0),
+    ("B", None, -5.0),
+    ("B", "b@example.com", 20.0),
+]
+
+
+def _queue_checks(validator):
+    """Register the same set of checks on a validator."""
+    validator.check_not_null(["id", "email"])
+    validator.check_unique(["id"])
+    validator.check_values_in_set("id", ["A", "B"])
+    validator.check_range("amount", min_value=0)
+    validator.check_row_count(min_count=1)
+
+
+class TestFusedChecks:
+    """Tests for evaluating deferred checks in one aggregation."""
+    
+    def test_matches_immediate_results(self, spark):
+        """Test that deferred checks report the same counts as immediate ones."""
+        df = spark.createDataFrame(ROWS, SCHEMA)
+        
+        immediate = DataQualityValidator(df, "t")
+        _queue_checks(immediate)
+        
+        deferred = DataQualityValidator(df, "t", deferred=True)
+        _queue_checks(deferred)
+        deferred.run_all()
+        
+        def summary(v):
+            return [(r.check_name, r.passed, r.failed_count, r.total_count)
+                    for r in v.results]
+        
+        assert summary(deferred) == summary(immediate)
+        assert dict((r.check_name, r.failed_count) for r in deferred.results) == {
+            "not_null_id": 0,
+            "not_null_email": 1,
+            "unique_id": 1,
+            "valid_values_id": 0,
+            "range_amount": 1,
+            "row_count": 0,
+        }
+    
+    def test_run_all_is_one_job(self, spark):
+        """Test that run_all evaluates every queued check in a single job."""
+        df = spark.createDataFrame(ROWS, SCHEMA)
+        validator = DataQualityValidator(df, "t", deferred=True)
+        _queue_checks(validator)
+        
+        sc = spark.sparkContext
+        sc.setJobGroup("fused-checks", "run_all")
+        try:
+            validator.run_all()
+        finally:
+            sc.setLocalProperty("spark.jobGroup.id", None)
+        
+        assert len(sc.statusTracker().getJobIdsForGroup("fused-checks")) == 1
+    
+    def test_run_all_without_pending_checks(self, spark):
+        """Test that run_all with nothing queued returns no results."""
+        df = spark.createDataFrame(ROWS, SCHEMA)
+        validator = DataQualityValidator(df, "t", deferred=True)
+        
+        assert validator.run_all() == []
+
+
+class TestDeferredMode:
+    """Tests for checks queued on a deferred validator."""
+    
+    def test_checks_return_none_until_run(self, spark):
+        """Test that deferred checks are queued instead of evaluated."""
+        df = spark.createDataFrame(ROWS, SCHEMA)
+        validator = DataQualityValidator(df, "t", deferred=True)
+        
+        assert validator.check_unique(["id"]) is None
+        assert validator.check_not_null(["email"]) == []
+        assert validator.results == []
+    
+    def test_all_passed_flushes_pending_checks(self, spark):
+        """Test that all_passed does not report unevaluated checks as passing."""
+        df = spark.createDataFrame(ROWS, SCHEMA)
+        validator = DataQualityValidator(df, "t", deferred=True)
+        validator.check_unique(["id"])
+        
+        assert validator.all_passed() is False
+        assert len(validator.results) == 1
+    
+    def test_summary_flushes_pending_checks(self, spark):
+        """Test that get_summary includes checks queued before it was called."""
+        df = spark.createDataFrame(ROWS, SCHEMA)
+        validator = DataQualityValidator(df, "t", deferred=True)
+        validator.check_not_null(["email"], severity=CheckSeverity.WARNING)
+        
+        summary = validator.get_summary()
+        assert "Checks passed: 0/1" in summary
+        assert "not_null_email" in summary
+
+
+class TestCheckUnique:
+    """Tests for null handling in uniqueness checks."""
+    
+    @pytest.mark.parametrize("deferred", [False, True])
+    def test_single_column_nulls_count_as_one_value(self, spark, deferred):
+        """Test that repeated nulls are duplicates, as with distinct()."""
+        df = spark.createDataFrame(
+            [("A", None, 1.0), (None, None, 2.0), (None, None, 3.0)], SCHEMA)
+        validator = DataQualityValidator(df, "t", deferred=deferred)
+        validator.check_unique(["id"])
+        validator.run_all()
+        
+        expected = df.count() - df.select("id").distinct().count()
+        assert validator.results[0].failed_count == expected == 1
+    
+    def test_single_null_is_unique(self, spark):
+        """Test that one null key on its own is not a duplicate."""
+        df = spark.createDataFrame(
+            [("A", None, 1.0), (None, None, 2.0)], SCHEMA)
+        
+        result = DataQualityValidator(df, "t").check_unique(["id"])
+        assert result.passed
+    
+    def test_multi_column_keys_with_null_parts(self, spark):
+        """Test that composite keys with null parts match distinct()."""
+        df = spark.createDataFrame(
+            [("A", None, 1.0), ("A", None, 2.0), ("A", "x", 3.0),
+             (None, None, 4.0)],
+            SCHEMA)
+        
+        result = DataQualityValidator(df, "t").check_unique(["id", "email"])
+        
+        expected = df.count() - df.select("id", "email").distinct().count()
+        assert result.failed_count == expected == 1
+
+
+class TestShouldBroadcast:
+    """Tests for the broadcast decision of referential integrity checks."""
+    
+    THRESHOLD = "spark.sql.autoBroadcastJoinThreshold"
+    
+    @pytest.mark.parametrize("threshold, expected", [
+        ("10m", True),
+        ("1b", False),
+        ("-1", False),
+    ])
+    def test_follows_session_threshold(self, spark, threshold, expected):
+        """Test that only key sets within the session threshold broadcast."""
+        df = spark.createDataFrame(ROWS, SCHEMA).select("id").distinct()
+        previous = spark.conf.get(self.THRESHOLD)
+        spark.conf.set(self.THRESHOLD, threshold)
+        try:
+            assert _should_broadcast(df) is expected
+        finally:
+            spark.conf.set(self.THRESHOLD, previous)